@@ -0,0 +1,58 @@
+"""Long-lived render worker: imports Manim once, then renders scripts sent as JSON lines on stdin"""
+import json
+import os
+import sys
+import importlib.util
+import traceback
+
+import manim
+
+def render_scene(job, replies):
+    """Render MainScene by importing the job's script into this process"""
+    script_path = job['script_path']
+    render_config = {
+        'input_file': script_path,
+        'quality': job['quality'],
+        'disable_caching': job['disable_caching'],
+        'media_dir': job['media_dir'],
+        'partial_movie_dir': job['partial_movie_dir'],
+        'tex_dir': job['tex_dir'],
+        'text_dir': job['text_dir']
+    }
+    try:
+        with manim.tempconfig(render_config):
+            spec = importlib.util.spec_from_file_location('animation', script_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            scene = module.MainScene()
+            play = scene.play
+
+            def play_and_report(*args, **kwargs):
+                play(*args, **kwargs)
+                send(replies, {'progress': scene.renderer.num_plays})
+
+            # construct() calls self.play, so this reports after every animation
+            scene.play = play_and_report
+            scene.render()
+    except Exception:
+        # Report the traceback the way a failed CLI run would on stderr
+        return 1, traceback.format_exc()
+    return 0, ''
+
+def send(replies, message):
+    """Write one JSON message to the parent process"""
+    replies.write(json.dumps(message) + '\n')
+    replies.flush()
+
+def main():
+    # Keep the real stdout for replies; Manim's logging and any print() in
+    # the rendered scripts go to stderr instead
+    replies = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    for line in sys.stdin:
+        returncode, stderr = render_scene(json.loads(line), replies)
+        send(replies, {'returncode': returncode, 'stderr': stderr})
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,19 @@
 import streamlit as st
-import google.generativeai as genai
-import subprocess
 import os
-import tempfile
-import shutil
 from pathlib import Path
 import time
-import uuid
 from dotenv import load_dotenv
-import re
+import hashlib
+from diskcache import Cache
+from tasks import render_job, warm_up_render_worker, new_session_id
+from script_helpers import (
+    get_generation_prompt,
+    get_error_analysis_prompt,
+    clean_script_response,
+    analyze_error_message,
+    auto_fix_manim_syntax,
+    validate_script
+)
 
 # Configure the page
 st.set_page_config(
@@ -24,168 +29,32 @@ st.markdown("Generate 2D educational animations in the style of 3Blue1Brown usin
 # Load API key from .env file
 load_dotenv()
 api_key = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=api_key)
 
 # Use the more capable Gemini model
-model = genai.GenerativeModel('models/gemini-2.5-pro-preview-06-05')
-
-def get_enhanced_system_prompt():
-    """Enhanced system prompt with comprehensive Manim guidelines"""
-    return """You are an expert Manim developer specializing in creating educational animations like 3Blue1Brown. You MUST generate syntactically correct Manim Community Edition v0.19.0 code.
-
-🎯 CRITICAL SUCCESS CRITERIA:
-1. Generate WORKING, ERROR-FREE Manim code that renders successfully
-2. Use ONLY modern Manim Community v0.19.0+ syntax
-3. Create engaging, educational content with smooth animations
-4. Follow 3Blue1Brown's pedagogical style and visual aesthetics
-
-📋 MANDATORY SYNTAX REQUIREMENTS (v0.19.0+):
-
-🔸 SCENE STRUCTURE:
-- Class MUST be named 'MainScene' inheriting from Scene
-- Use construct(self) method for all animation logic
-- Start with: from manim import *
-
-🔸 TEXT AND MATH:
-✅ CORRECT: Text("Hello World")
-✅ CORRECT: MathTex(r"x^2 + y^2 = z^2")
-❌ WRONG: TextMobject, TexMobject (DEPRECATED)
-
-🔸 POSITIONING:
-✅ CORRECT: obj.move_to(ORIGIN), obj.center(), obj.shift(UP)
-❌ WRONG: obj.to_center() (DEPRECATED)
-
-🔸 AXES CONFIGURATION (CRITICAL):
-✅ CORRECT: 
-```python
-axes = Axes(
-    x_range=[-3, 3, 1],  # [min, max, step]
-    y_range=[-2, 2, 1],
-    x_length=6,
-    y_length=4,
-    axis_config={"color": BLUE}  # Visual properties only
-)
-```
-❌ WRONG: Putting x_range/y_range inside x_axis_config or y_axis_config
-
-🔸 GRAPH PLOTTING:
-✅ CORRECT: 
-```python
-func = lambda x: x**2  # Define function first
-graph = axes.plot(func, x_range=[-2, 2], color=BLUE)
-```
-❌ WRONG: axes.get_graph() (DEPRECATED)
+_MODEL_NAME = 'models/gemini-2.5-pro-preview-06-05'
 
-🔸 ANIMATIONS:
-- Use self.play() for animations
-- Use self.add() for instant additions
-- Use self.wait(duration) for pauses
-- Common animations: Write, Create, Transform, FadeIn, FadeOut, DrawBorderThenFill
-
-🔸 COLORS:
-Use Manim constants: BLUE, RED, GREEN, YELLOW, PURPLE, ORANGE, WHITE, BLACK
-
-🎨 EDUCATIONAL DESIGN PRINCIPLES:
-1. Start with a clear title and introduction
-2. Build concepts step by step
-3. Use visual metaphors and analogies
-4. Highlight key insights with color changes
-5. Include mathematical expressions when relevant
-6. End with a summary or key takeaway
-7. Use smooth transitions between concepts
-
-🔧 CODE STRUCTURE TEMPLATE:
-```python
-from manim import *
-
-class MainScene(Scene):
-    def construct(self):
-        # 1. Title and introduction
-        title = Text("Your Educational Topic", font_size=48)
-        title.move_to(ORIGIN + UP * 2)
-        self.play(Write(title))
-        self.wait()
-        
-        # 2. Main content with step-by-step building
-        # Your educational content here
-        
-        # 3. Mathematical expressions (if needed)
-        equation = MathTex(r"f(x) = x^2")
-        equation.move_to(ORIGIN)
-        self.play(Write(equation))
-        
-        # 4. Visual elements (graphs, shapes, etc.)
-        if using_axes:
-            axes = Axes(
-                x_range=[-3, 3, 1],
-                y_range=[-2, 2, 1]
-            )
-            func = lambda x: x**2
-            graph = axes.plot(func, x_range=[-2, 2])
-            self.play(Create(axes), Create(graph))
-        
-        # 5. Animations and transformations
-        self.play(Transform(old_obj, new_obj))
-        self.wait()
-        
-        # 6. Conclusion
-        conclusion = Text("Key Insight: [Your insight here]")
-        self.play(Write(conclusion))
-        self.wait(2)
-```
+# Gemini responses are cached on disk for a week; bump the version whenever
+# the prompts in script_helpers.py change so stale responses are not reused
+_PROMPT_VERSION = 1
+_RESPONSE_CACHE_EXPIRE = 7 * 24 * 60 * 60
 
-⚠️ CRITICAL REQUIREMENTS:
-- Return ONLY Python code, no markdown formatting
-- Do NOT wrap in ```python``` blocks
-- Ensure all objects are properly positioned
-- Test all syntax mentally before generating
-- Use descriptive variable names
-- Include appropriate wait() statements for pacing
-- Make animations educational and engaging
-
-Remember: The goal is to create animations that help viewers understand complex concepts through visual storytelling, just like 3Blue1Brown does."""
-
-def get_error_analysis_prompt(error_message, script_content):
-    """Generate a prompt for analyzing and fixing errors"""
-    return f"""You are debugging a Manim script that failed to render. Analyze the error and generate a corrected version.
-
-ERROR MESSAGE:
-{error_message}
-
-ORIGINAL SCRIPT:
-{script_content}
-
-🔍 DEBUGGING INSTRUCTIONS:
-1. Carefully analyze the error message to identify the root cause
-2. Check for common Manim syntax issues:
-   - Deprecated methods (to_center, TexMobject, TextMobject, get_graph)
-   - Incorrect axes configuration (x_range/y_range in wrong place)
-   - Missing imports or undefined variables
-   - Incorrect parameter names or values
-   - Animation syntax errors
-
-3. Apply the correct Manim Community v0.19.0+ syntax
-4. Ensure all objects are properly defined before use
-5. Verify all function calls use correct parameters
-
-CRITICAL: Generate a COMPLETE, corrected script that will render successfully. 
-Return ONLY the corrected Python code with no markdown formatting.
-The script must start with 'from manim import *' and contain a MainScene class."""
+# Queued renders time out on the worker after _RENDER_JOB_TIMEOUT seconds; the
+# app stops waiting once a job has also sat in the queue this much longer
+_RENDER_JOB_TIMEOUT = 600
+_RENDER_QUEUE_WAIT = 300
 
 def generate_manim_script(prompt, attempt=1, previous_error=None, previous_script=None):
     """Generate a Manim script using Gemini API with self-correction"""
     try:
         if attempt == 1:
             # First attempt - use enhanced system prompt
-            system_prompt = get_enhanced_system_prompt()
-            full_prompt = f"{system_prompt}\n\nCreate an educational animation about: {prompt}"
+            full_prompt = get_generation_prompt(prompt)
         else:
             # Subsequent attempts - use error analysis prompt
             system_prompt = get_error_analysis_prompt(previous_error, previous_script)
             full_prompt = f"{system_prompt}\n\nFix the errors and regenerate the script for: {prompt}"
         
-        response = model.generate_content(full_prompt)
-        script = response.text.strip()
+        script = generate_content(full_prompt, _MODEL_NAME)
         
         # Clean the response - remove markdown code blocks if present
         script = clean_script_response(script)
@@ -195,168 +64,90 @@ def generate_manim_script(prompt, attempt=1, previous_error=None, previous_scrip
         st.error(f"Error generating script (attempt {attempt}): {str(e)}")
         return None
 
-def clean_script_response(script):
-    """Clean the AI response to extract pure Python code"""
-    # Remove markdown code blocks
-    if script.startswith('```python'):
-        script = script[9:]
-    elif script.startswith('```'):
-        script = script[3:]
-    
-    if script.endswith('```'):
-        script = script[:-3]
-    
-    # Remove any leading/trailing whitespace
-    script = script.strip()
-    
-    # Ensure it starts with the import statement
-    if not script.startswith('from manim import'):
-        # Find the import line and move it to the beginning
-        lines = script.split('\n')
-        import_line = None
-        other_lines = []
-        
-        for line in lines:
-            if line.strip().startswith('from manim import'):
-                import_line = line
-            else:
-                other_lines.append(line)
+@st.cache_resource(show_spinner=False)
+def get_model(api_key, model_name):
+    """Configure Gemini and build the model on first use, reused across reruns"""
+    # Imported here so the grpc/protobuf stack only loads once a prompt is sent
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
+@st.cache_resource(show_spinner=False)
+def get_response_cache():
+    """Open the on-disk Gemini response cache, shared across sessions and restarts"""
+    return Cache(".gemini_cache")
+
+def generate_content(full_prompt, model_name):
+    """Call Gemini for a full prompt, cached so repeated prompts skip the API round-trip"""
+    # The full prompt already carries the previous error and script on
+    # correction attempts, so identical failures reuse the earlier fix
+    cache_key = hashlib.sha256(
+        f"{_PROMPT_VERSION}\n{model_name}\n{full_prompt}".encode('utf-8')
+    ).hexdigest()
+    cache = get_response_cache()
+    script = cache.get(cache_key)
+    if script is None:
+        # Stream the response so the script is shown as it is generated
+        response = get_model(api_key, model_name).generate_content(full_prompt, stream=True)
+        preview = st.empty()
+        chunks = []
+        try:
+            for chunk in response:
+                chunks.append(chunk.text)
+                preview.code(''.join(chunks)[-2000:], language="python")
+        finally:
+            # Don't leave partial code on the page if the stream is cut off
+            preview.empty()
         
-        if import_line:
-            script = import_line + '\n' + '\n'.join(other_lines)
-    
+        script = ''.join(chunks).strip()
+        # An empty response (e.g. blocked by safety filters) is retried next time
+        if script:
+            cache.set(cache_key, script, expire=_RESPONSE_CACHE_EXPIRE)
     return script
 
-def analyze_error_message(stderr):
-    """Analyze error message and extract relevant information"""
-    error_info = {
-        'type': 'Unknown',
-        'details': stderr,
-        'suggestions': []
-    }
-    
-    # Common error patterns and suggestions
-    error_patterns = [
-        {
-            'pattern': r'multiple values for argument [\'"]x_range[\'"]',
-            'type': 'Axes Configuration Error',
-            'suggestion': 'Move x_range and y_range out of axis_config and into main Axes parameters'
-        },
-        {
-            'pattern': r'AttributeError.*to_center',
-            'type': 'Deprecated Method',
-            'suggestion': 'Replace .to_center() with .move_to(ORIGIN) or .center()'
-        },
-        {
-            'pattern': r'NameError.*TexMobject',
-            'type': 'Deprecated Class',
-            'suggestion': 'Replace TexMobject with MathTex'
-        },
-        {
-            'pattern': r'NameError.*TextMobject',
-            'type': 'Deprecated Class',
-            'suggestion': 'Replace TextMobject with Text'
-        },
-        {
-            'pattern': r'AttributeError.*get_graph',
-            'type': 'Deprecated Method',
-            'suggestion': 'Replace axes.get_graph() with axes.plot()'
-        },
-        {
-            'pattern': r'TypeError.*unexpected keyword argument',
-            'type': 'Parameter Error',
-            'suggestion': 'Check parameter names and remove invalid arguments'
-        }
-    ]
-    
-    for pattern_info in error_patterns:
-        if re.search(pattern_info['pattern'], stderr, re.IGNORECASE):
-            error_info['type'] = pattern_info['type']
-            error_info['suggestions'].append(pattern_info['suggestion'])
-    
-    return error_info
-
-def auto_fix_manim_syntax(script_content):
-    """Automatically fix common Manim syntax issues"""
-    fixes_applied = []
-    
-    # Fix .to_center() -> .move_to(ORIGIN)
-    if '.to_center()' in script_content:
-        script_content = script_content.replace('.to_center()', '.move_to(ORIGIN)')
-        fixes_applied.append("Replaced .to_center() with .move_to(ORIGIN)")
-    
-    # Fix TexMobject -> MathTex
-    if 'TexMobject' in script_content:
-        script_content = script_content.replace('TexMobject', 'MathTex')
-        fixes_applied.append("Replaced TexMobject with MathTex")
-    
-    # Fix TextMobject -> Text
-    if 'TextMobject' in script_content:
-        script_content = script_content.replace('TextMobject', 'Text')
-        fixes_applied.append("Replaced TextMobject with Text")
-    
-    # Fix axes configuration
-    script_content, axes_fixes = fix_axes_configurations(script_content)
-    fixes_applied.extend(axes_fixes)
-    
-    # Fix get_graph syntax
-    pattern = r'\.get_graph\((.*?)\)'
-    if re.search(pattern, script_content):
-        script_content = re.sub(pattern, r'.plot(\1)', script_content)
-        fixes_applied.append("Replaced .get_graph() with .plot()")
-    
-    return script_content, fixes_applied
-
-def fix_axes_configurations(script_content):
-    """Fix Axes configurations by moving x_range/y_range out of axis configs"""
-    fixes_applied = []
-    
-    # Pattern to find problematic Axes configurations
-    axes_pattern = r'Axes\s*\((.*?)\)'
-    matches = re.finditer(axes_pattern, script_content, re.DOTALL)
-    
-    for match in matches:
-        original = match.group(0)
-        axes_content = match.group(1)
-        
-        # Check if x_range or y_range are in axis configs
-        if 'x_axis_config' in axes_content and 'x_range' in axes_content:
-            # Extract and fix
-            fixed_axes = fix_single_axes_config(original)
-            if fixed_axes != original:
-                script_content = script_content.replace(original, fixed_axes)
-                fixes_applied.append("Fixed Axes configuration - moved ranges out of axis configs")
-    
-    return script_content, fixes_applied
-
-def fix_single_axes_config(axes_string):
-    """Fix a single Axes configuration"""
-    # This is a simplified version - you might want to enhance this
-    # for more complex cases
-    
-    # Basic fix: if we see x_axis_config with x_range, try to extract it
-    if 'x_axis_config' in axes_string and 'x_range' in axes_string:
-        # Simple replacement for common patterns
-        axes_string = re.sub(
-            r'x_axis_config\s*=\s*\{\s*["\']x_range["\']\s*:\s*(\[.*?\])\s*\}',
-            r'x_range=\1',
-            axes_string
-        )
-    
-    if 'y_axis_config' in axes_string and 'y_range' in axes_string:
-        axes_string = re.sub(
-            r'y_axis_config\s*=\s*\{\s*["\']y_range["\']\s*:\s*(\[.*?\])\s*\}',
-            r'y_range=\1',
-            axes_string
-        )
+@st.cache_resource(show_spinner=False)
+def get_render_queue():
+    """Connect to the RQ render queue if REDIS_URL is set, otherwise return None"""
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        return None
+    from redis import Redis
+    from rq import Queue
+    return Queue('manim', connection=Redis.from_url(redis_url))
+
+def run_render_job(script_content, work_prefix, force_rerender=False, on_progress=None):
+    """Render a script on the RQ workers if a queue is configured, otherwise in-process"""
+    queue = get_render_queue()
+    if queue is None:
+        return render_job(script_content, work_prefix, force_rerender, on_progress)
     
-    return axes_string
-
-def save_and_render_script(script_content, session_id, auto_fix=True, max_attempts=3):
+    job = queue.enqueue(render_job, script_content, work_prefix, force_rerender, job_timeout=_RENDER_JOB_TIMEOUT)
+    # Give up if no worker picks the job up, or a worker dies holding it
+    deadline = time.monotonic() + _RENDER_QUEUE_WAIT + _RENDER_JOB_TIMEOUT
+    while True:
+        status = job.get_status()
+        if status == 'finished':
+            return job.result
+        if status not in ('queued', 'started', 'deferred', 'scheduled'):
+            # Includes failed/stopped/canceled and None once the job has expired
+            raise RuntimeError(f"Render job {job.id} {status}")
+        if time.monotonic() > deadline:
+            job.cancel()
+            return {
+                'returncode': 1,
+                'stdout': '',
+                'stderr': f"TimeoutError: render job {job.id} was still {status} after {_RENDER_QUEUE_WAIT + _RENDER_JOB_TIMEOUT} seconds and was canceled",
+                'video_path': None
+            }
+        time.sleep(1)
+
+def save_and_render_script(script_content, session_id, auto_fix=True, max_attempts=3, force_rerender=False):
     """Save the script and render it with Manim, with self-correction"""
     
     current_script = script_content
     attempt = 1
+    # Hashes of scripts already tried, so an unchanged AI correction isn't re-rendered
+    tried_scripts = set()
     
     while attempt <= max_attempts:
         try:
@@ -366,57 +157,31 @@ def save_and_render_script(script_content, session_id, auto_fix=True, max_attemp
                 if fixes_applied:
                     st.info(f"🔧 **Auto-fixes Applied (Attempt {attempt})**: {', '.join(fixes_applied)}")
             
-            # Create a unique directory for this session
-            work_dir = Path(f"manim_work_{session_id}_{attempt}")
-            work_dir.mkdir(exist_ok=True)
-            
-            # Save the script with UTF-8 encoding
-            script_path = work_dir / "animation.py"
-            with open(script_path, 'w', encoding='utf-8') as f:
-                f.write(current_script)
-            
-            # Run Manim to render the animation
-            script_abs_path = script_path.resolve()
-            cmd = [
-                "manim", 
-                str(script_abs_path),
-                "MainScene",
-                "-ql",
-                "--disable_caching",
-                f"--media_dir={work_dir.resolve()}/media"
-            ]
-            
-            # Execute Manim
-            env = os.environ.copy()
-            env['PYTHONIOENCODING'] = 'utf-8'
-            env['PYTHONLEGACYWINDOWSFSENCODING'] = '0'
+            # Catch scripts that can't render before paying for Manim
+            validation_error = validate_script(current_script)
+            if validation_error:
+                result = {'returncode': 1, 'stdout': '', 'stderr': validation_error, 'video_path': None}
+            else:
+                # Render in a unique directory for this session, showing
+                # progress as each animation finishes
+                work_prefix = f"manim_work_{session_id}_{attempt}_"
+                progress = st.empty()
+                try:
+                    result = run_render_job(
+                        current_script,
+                        work_prefix,
+                        force_rerender,
+                        lambda plays: progress.caption(f"🎞️ Rendered {plays} animation(s)...")
+                    )
+                finally:
+                    progress.empty()
             
-            result = subprocess.run(
-                cmd, 
-                capture_output=True, 
-                text=True, 
-                encoding='utf-8',
-                errors='ignore',
-                env=env
-            )
+            # Only scripts that produced a result count as tried; a render
+            # that raised is retried unchanged
+            tried_scripts.add(hashlib.blake2b(current_script.encode('utf-8'), digest_size=16).hexdigest())
             
-            if result.returncode == 0:
-                # Success! Find the generated video file
-                media_dir = work_dir / "media" / "videos" / "animation" / "480p15"
-                possible_paths = [
-                    media_dir,
-                    work_dir / "media" / "videos" / "480p15",
-                    work_dir / "media" / "videos",
-                    work_dir / "media"
-                ]
-                
-                video_path = None
-                for path in possible_paths:
-                    if path.exists():
-                        video_files = list(path.glob("*.mp4"))
-                        if video_files:
-                            video_path = str(video_files[0])
-                            break
+            if result['returncode'] == 0:
+                video_path = result['video_path']
                 
                 if video_path:
                     if attempt > 1:
@@ -428,7 +193,7 @@ def save_and_render_script(script_content, session_id, auto_fix=True, max_attemp
             
             else:
                 # Rendering failed - analyze error and try to fix
-                error_info = analyze_error_message(result.stderr)
+                error_info = analyze_error_message(result['stderr'])
                 
                 st.warning(f"⚠️ **Attempt {attempt} failed**: {error_info['type']}")
                 
@@ -440,11 +205,15 @@ def save_and_render_script(script_content, session_id, auto_fix=True, max_attemp
                         corrected_script = generate_manim_script(
                             prompt="", # We'll use the error analysis prompt
                             attempt=attempt + 1,
-                            previous_error=result.stderr,
+                            previous_error=result['stderr'],
                             previous_script=current_script
                         )
                     
                     if corrected_script:
+                        corrected_hash = hashlib.blake2b(corrected_script.encode('utf-8'), digest_size=16).hexdigest()
+                        if corrected_hash in tried_scripts:
+                            st.warning("⚠️ AI returned an identical script; aborting retries")
+                            break
                         current_script = corrected_script
                         st.info("🤖 **AI has generated a corrected version**")
                     else:
@@ -462,8 +231,8 @@ def save_and_render_script(script_content, session_id, auto_fix=True, max_attemp
                             st.error(f"• {suggestion}")
                     
                     with st.expander("View Full Error Details"):
-                        st.code(f"STDOUT:\n{result.stdout}", language="text")
-                        st.code(f"STDERR:\n{result.stderr}", language="text")
+                        st.code(f"STDOUT:\n{result['stdout']}", language="text")
+                        st.code(f"STDERR:\n{result['stderr']}", language="text")
                     
                     return None, current_script
         
@@ -476,10 +245,17 @@ def save_and_render_script(script_content, session_id, auto_fix=True, max_attemp
     
     return None, current_script
 
+@st.cache_resource(show_spinner=False, max_entries=2, ttl=300)
+def load_video_bytes(video_path, mtime):
+    """Read a rendered video once and share the bytes without copying; mtime is part of the cache key so changed files are re-read"""
+    # Only the latest videos are held, and briefly, since they stay in memory
+    # for every session until evicted
+    return Path(video_path).read_bytes()
+
 def main():
     # Initialize session state
     if 'session_id' not in st.session_state:
-        st.session_state.session_id = str(uuid.uuid4())
+        st.session_state.session_id = new_session_id()
     
     if 'generated_script' not in st.session_state:
         st.session_state.generated_script = None
@@ -487,22 +263,32 @@ def main():
     if 'video_path' not in st.session_state:
         st.session_state.video_path = None
     
-    # Settings in sidebar
+    # Settings in sidebar, batched in a form so changing them doesn't rerun
+    # the app until they are applied
     with st.sidebar:
         st.header("⚙️ Settings")
-        auto_fix_enabled = st.checkbox(
-            "🔧 Auto-fix syntax errors", 
-            value=True,
-            help="Automatically fix common outdated Manim syntax"
-        )
-        
-        max_attempts = st.slider(
-            "🔄 Max correction attempts",
-            min_value=1,
-            max_value=5,
-            value=3,
-            help="Maximum number of AI self-correction attempts"
-        )
+        with st.form("settings"):
+            auto_fix_enabled = st.checkbox(
+                "🔧 Auto-fix syntax errors", 
+                value=True,
+                help="Automatically fix common outdated Manim syntax"
+            )
+            
+            max_attempts = st.slider(
+                "🔄 Max correction attempts",
+                min_value=1,
+                max_value=5,
+                value=3,
+                help="Maximum number of AI self-correction attempts"
+            )
+            
+            force_rerender = st.checkbox(
+                "♻️ Force full re-render",
+                value=False,
+                help="Ignore previously rendered videos and Manim's animation cache"
+            )
+            
+            st.form_submit_button("Apply")
         
         st.markdown("---")
         st.markdown("**Features:**")
@@ -525,19 +311,24 @@ def main():
         generate_button = st.button("🎬 Generate Animation", type="primary")
         
         if generate_button and prompt and api_key:
+            # Renders run locally without a queue; get Manim imported while Gemini responds
+            if get_render_queue() is None:
+                warm_up_render_worker()
+            
             with st.spinner("🤖 Generating enhanced Manim script..."):
                 script = generate_manim_script(prompt)
             
             if script:
                 st.session_state.generated_script = script
-                st.session_state.session_id = str(uuid.uuid4())
+                st.session_state.session_id = new_session_id()
                 
                 with st.spinner("🎬 Rendering animation with self-correction..."):
                     video_path, final_script = save_and_render_script(
                         script, 
                         st.session_state.session_id, 
                         auto_fix_enabled,
-                        max_attempts
+                        max_attempts,
+                        force_rerender
                     )
                     st.session_state.video_path = video_path
                     st.session_state.generated_script = final_script
@@ -556,16 +347,19 @@ def main():
         st.header("🎥 Output")
         
         if st.session_state.video_path and os.path.exists(st.session_state.video_path):
-            # Display the video
-            with open(st.session_state.video_path, 'rb') as video_file:
-                video_bytes = video_file.read()
-                st.video(video_bytes)
+            # Display the video straight from disk via Streamlit's media server
+            st.video(st.session_state.video_path)
             
             # Download button
             st.download_button(
                 label="📥 Download Animation",
-                data=video_bytes,
-                file_name=f"manim_animation_{int(time.time())}.mp4",
+                data=load_video_bytes(
+                    st.session_state.video_path,
+                    os.path.getmtime(st.session_state.video_path)
+                ),
+                # A stable name (not a timestamp) lets Streamlit reuse the
+                # registered media file across reruns
+                file_name=f"manim_animation_{Path(st.session_state.video_path).stem[:8]}.mp4",
                 mime="video/mp4"
             )
         else:
@@ -588,14 +382,23 @@ def main():
             with col_b:
                 rerender_auto_fix = st.checkbox("🔧 Apply auto-fixes", value=True)
             
-            if rerender_button:
+            script_unchanged = (
+                edited_script == st.session_state.generated_script
+                and st.session_state.video_path
+                and os.path.exists(st.session_state.video_path)
+            )
+            
+            if rerender_button and script_unchanged and not force_rerender:
+                st.info("Script unchanged — reusing existing video.")
+            elif rerender_button:
                 with st.spinner("🎬 Re-rendering with corrections..."):
-                    st.session_state.session_id = str(uuid.uuid4())
+                    st.session_state.session_id = new_session_id()
                     video_path, final_script = save_and_render_script(
                         edited_script, 
                         st.session_state.session_id, 
                         rerender_auto_fix,
-                        max_attempts
+                        max_attempts,
+                        force_rerender
                     )
                     st.session_state.video_path = video_path
                     st.session_state.generated_script = final_script
@@ -0,0 +1,442 @@
+"""Prompts, clean-up, validation and auto-fixes for generated Manim scripts (no Streamlit calls, so they load once per process rather than on every rerun)"""
+import re
+import ast
+import traceback
+import threading
+import functools
+
+# Precompiled patterns for the auto-fix helpers
+_LITERAL_FIXES = {
+    '.to_center()': ('.move_to(ORIGIN)', "Replaced .to_center() with .move_to(ORIGIN)"),
+    'TexMobject': ('MathTex', "Replaced TexMobject with MathTex"),
+    'TextMobject': ('Text', "Replaced TextMobject with Text"),
+}
+_DEPRECATED_RE = re.compile(
+    r'\.get_graph\(|' + '|'.join(re.escape(k) for k in _LITERAL_FIXES)
+)
+_AXES_RE = re.compile(r'Axes\s*\((.*?)\)', re.DOTALL)
+_X_AXIS_CFG_RE = re.compile(r'x_axis_config\s*=\s*\{\s*["\']x_range["\']\s*:\s*(\[.*?\])\s*\}')
+_Y_AXIS_CFG_RE = re.compile(r'y_axis_config\s*=\s*\{\s*["\']y_range["\']\s*:\s*(\[.*?\])\s*\}')
+
+# Common error patterns and suggestions for analyze_error_message
+_ERROR_PATTERNS = [
+    (re.compile(pattern, re.IGNORECASE), error_type, suggestion)
+    for pattern, error_type, suggestion in [
+        (
+            r'multiple values for argument [\'"]x_range[\'"]',
+            'Axes Configuration Error',
+            'Move x_range and y_range out of axis_config and into main Axes parameters'
+        ),
+        (
+            r'AttributeError.*to_center',
+            'Deprecated Method',
+            'Replace .to_center() with .move_to(ORIGIN) or .center()'
+        ),
+        (
+            r'NameError.*TexMobject',
+            'Deprecated Class',
+            'Replace TexMobject with MathTex'
+        ),
+        (
+            r'NameError.*TextMobject',
+            'Deprecated Class',
+            'Replace TextMobject with Text'
+        ),
+        (
+            r'AttributeError.*get_graph',
+            'Deprecated Method',
+            'Replace axes.get_graph() with axes.plot()'
+        ),
+        (
+            r'TypeError.*unexpected keyword argument',
+            'Parameter Error',
+            'Check parameter names and remove invalid arguments'
+        )
+    ]
+]
+
+# Enhanced system prompt with comprehensive Manim guidelines
+_SYSTEM_PROMPT = """You are an expert Manim developer specializing in creating educational animations like 3Blue1Brown. You MUST generate syntactically correct Manim Community Edition v0.19.0 code.
+
+🎯 CRITICAL SUCCESS CRITERIA:
+1. Generate WORKING, ERROR-FREE Manim code that renders successfully
+2. Use ONLY modern Manim Community v0.19.0+ syntax
+3. Create engaging, educational content with smooth animations
+4. Follow 3Blue1Brown's pedagogical style and visual aesthetics
+
+📋 MANDATORY SYNTAX REQUIREMENTS (v0.19.0+):
+
+🔸 SCENE STRUCTURE:
+- Class MUST be named 'MainScene' inheriting from Scene
+- Use construct(self) method for all animation logic
+- Start with: from manim import *
+
+🔸 TEXT AND MATH:
+✅ CORRECT: Text("Hello World")
+✅ CORRECT: MathTex(r"x^2 + y^2 = z^2")
+❌ WRONG: TextMobject, TexMobject (DEPRECATED)
+
+🔸 POSITIONING:
+✅ CORRECT: obj.move_to(ORIGIN), obj.center(), obj.shift(UP)
+❌ WRONG: obj.to_center() (DEPRECATED)
+
+🔸 AXES CONFIGURATION (CRITICAL):
+✅ CORRECT: 
+```python
+axes = Axes(
+    x_range=[-3, 3, 1],  # [min, max, step]
+    y_range=[-2, 2, 1],
+    x_length=6,
+    y_length=4,
+    axis_config={"color": BLUE}  # Visual properties only
+)
+```
+❌ WRONG: Putting x_range/y_range inside x_axis_config or y_axis_config
+
+🔸 GRAPH PLOTTING:
+✅ CORRECT: 
+```python
+func = lambda x: x**2  # Define function first
+graph = axes.plot(func, x_range=[-2, 2], color=BLUE)
+```
+❌ WRONG: axes.get_graph() (DEPRECATED)
+
+🔸 ANIMATIONS:
+- Use self.play() for animations
+- Use self.add() for instant additions
+- Use self.wait(duration) for pauses
+- Common animations: Write, Create, Transform, FadeIn, FadeOut, DrawBorderThenFill
+
+🔸 COLORS:
+Use Manim constants: BLUE, RED, GREEN, YELLOW, PURPLE, ORANGE, WHITE, BLACK
+
+🎨 EDUCATIONAL DESIGN PRINCIPLES:
+1. Start with a clear title and introduction
+2. Build concepts step by step
+3. Use visual metaphors and analogies
+4. Highlight key insights with color changes
+5. Include mathematical expressions when relevant
+6. End with a summary or key takeaway
+7. Use smooth transitions between concepts
+
+🔧 CODE STRUCTURE TEMPLATE:
+```python
+from manim import *
+
+class MainScene(Scene):
+    def construct(self):
+        # 1. Title and introduction
+        title = Text("Your Educational Topic", font_size=48)
+        title.move_to(ORIGIN + UP * 2)
+        self.play(Write(title))
+        self.wait()
+        
+        # 2. Main content with step-by-step building
+        # Your educational content here
+        
+        # 3. Mathematical expressions (if needed)
+        equation = MathTex(r"f(x) = x^2")
+        equation.move_to(ORIGIN)
+        self.play(Write(equation))
+        
+        # 4. Visual elements (graphs, shapes, etc.)
+        if using_axes:
+            axes = Axes(
+                x_range=[-3, 3, 1],
+                y_range=[-2, 2, 1]
+            )
+            func = lambda x: x**2
+            graph = axes.plot(func, x_range=[-2, 2])
+            self.play(Create(axes), Create(graph))
+        
+        # 5. Animations and transformations
+        self.play(Transform(old_obj, new_obj))
+        self.wait()
+        
+        # 6. Conclusion
+        conclusion = Text("Key Insight: [Your insight here]")
+        self.play(Write(conclusion))
+        self.wait(2)
+```
+
+⚠️ CRITICAL REQUIREMENTS:
+- Return ONLY Python code, no markdown formatting
+- Do NOT wrap in ```python``` blocks
+- Ensure all objects are properly positioned
+- Test all syntax mentally before generating
+- Use descriptive variable names
+- Include appropriate wait() statements for pacing
+- Make animations educational and engaging
+
+Remember: The goal is to create animations that help viewers understand complex concepts through visual storytelling, just like 3Blue1Brown does."""
+
+# First-attempt prompts only differ by the user's request appended to this
+_PROMPT_PREFIX = _SYSTEM_PROMPT + "\n\nCreate an educational animation about: "
+
+def get_generation_prompt(prompt):
+    """Generate the first-attempt prompt for a user's request"""
+    return _PROMPT_PREFIX + prompt
+
+def get_error_analysis_prompt(error_message, script_content):
+    """Generate a prompt for analyzing and fixing errors"""
+    return f"""You are debugging a Manim script that failed to render. Analyze the error and generate a corrected version.
+
+ERROR MESSAGE:
+{error_message}
+
+ORIGINAL SCRIPT:
+{script_content}
+
+🔍 DEBUGGING INSTRUCTIONS:
+1. Carefully analyze the error message to identify the root cause
+2. Check for common Manim syntax issues:
+   - Deprecated methods (to_center, TexMobject, TextMobject, get_graph)
+   - Incorrect axes configuration (x_range/y_range in wrong place)
+   - Missing imports or undefined variables
+   - Incorrect parameter names or values
+   - Animation syntax errors
+
+3. Apply the correct Manim Community v0.19.0+ syntax
+4. Ensure all objects are properly defined before use
+5. Verify all function calls use correct parameters
+
+CRITICAL: Generate a COMPLETE, corrected script that will render successfully. 
+Return ONLY the corrected Python code with no markdown formatting.
+The script must start with 'from manim import *' and contain a MainScene class."""
+
+def clean_script_response(script):
+    """Clean the AI response to extract pure Python code"""
+    # Remove markdown code blocks and any leading/trailing whitespace
+    script = script.removeprefix('```python').removeprefix('```').removesuffix('```').strip()
+    
+    # Ensure it starts with the import statement
+    if not script.startswith('from manim import'):
+        # Move the first import line to the beginning without splitting the
+        # whole script into lines, skipping mentions that don't start a line
+        idx = script.find('from manim import')
+        while idx != -1:
+            line_start = script.rfind('\n', 0, idx) + 1
+            if not script[line_start:idx].strip(' \t'):
+                line_end = script.find('\n', idx)
+                if line_end == -1:
+                    line_end = len(script)
+                before = script[:line_start]
+                after = script[line_end + 1:]
+                script = script[idx:line_end] + '\n' + before + after
+                break
+            idx = script.find('from manim import', idx + 1)
+    
+    return script
+
+@functools.cache
+def get_error_pattern_database():
+    """Compile the error patterns into one Hyperscan database with the lock guarding its scratch space, or return None without Hyperscan"""
+    # Optional: match all error patterns in a single pass when Hyperscan is installed
+    try:
+        import hyperscan
+    except ImportError:
+        return None
+    database = hyperscan.Database()
+    database.compile(
+        expressions=[pattern.pattern.encode('utf-8') for pattern, _, _ in _ERROR_PATTERNS],
+        ids=list(range(len(_ERROR_PATTERNS))),
+        elements=len(_ERROR_PATTERNS),
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(_ERROR_PATTERNS)
+    )
+    # The database shares one scratch space, which only one scan may use at a
+    # time across the server's session threads
+    return database, threading.Lock()
+
+def analyze_error_message(stderr):
+    """Analyze error message and extract relevant information"""
+    error_info = {
+        'type': 'Unknown',
+        'details': stderr,
+        'suggestions': []
+    }
+    
+    pattern_database = get_error_pattern_database()
+    if pattern_database is not None:
+        database, scan_lock = pattern_database
+        matched_ids = set()
+        
+        def on_match(pattern_id, start, end, flags, context):
+            matched_ids.add(pattern_id)
+        
+        with scan_lock:
+            database.scan(stderr.encode('utf-8'), match_event_handler=on_match)
+        matches = [p for i, p in enumerate(_ERROR_PATTERNS) if i in matched_ids]
+    else:
+        matches = [p for p in _ERROR_PATTERNS if p[0].search(stderr)]
+    
+    for _, error_type, suggestion in matches:
+        error_info['type'] = error_type
+        error_info['suggestions'].append(suggestion)
+    
+    return error_info
+
+def auto_fix_manim_syntax(script_content):
+    """Automatically fix common Manim syntax issues"""
+    fixes_applied = []
+    
+    # Fix deprecated names (.to_center(), TexMobject, TextMobject) and
+    # .get_graph() -> .plot() in one pass
+    matched = set()
+    
+    def replace_deprecated(match):
+        matched.add(match.group(0))
+        # Only the opening of a .get_graph( call is matched, so its arguments
+        # are scanned like the rest of the script
+        if match.group(0) == '.get_graph(':
+            return '.plot('
+        return _LITERAL_FIXES[match.group(0)][0]
+    
+    script_content = _DEPRECATED_RE.sub(replace_deprecated, script_content)
+    for literal, (_, message) in _LITERAL_FIXES.items():
+        if literal in matched:
+            fixes_applied.append(message)
+    
+    # Fix axes configuration
+    script_content, axes_fixes = fix_axes_configurations(script_content)
+    fixes_applied.extend(axes_fixes)
+    
+    if '.get_graph(' in matched:
+        fixes_applied.append("Replaced .get_graph() with .plot()")
+    
+    return script_content, fixes_applied
+
+def fix_axes_configurations(script_content):
+    """Fix Axes configurations by moving x_range/y_range out of axis configs"""
+    try:
+        return fix_axes_configurations_ast(script_content)
+    except SyntaxError:
+        # Unparseable scripts fall back to the regex-based fix
+        pass
+    
+    fixes_applied = []
+    
+    def fix_match(match):
+        original = match.group(0)
+        axes_content = match.group(1)
+        
+        # Check if x_range or y_range are in axis configs
+        if 'x_axis_config' in axes_content and 'x_range' in axes_content:
+            # Extract and fix
+            fixed_axes = fix_single_axes_config(original)
+            if fixed_axes != original:
+                fixes_applied.append("Fixed Axes configuration - moved ranges out of axis configs")
+                return fixed_axes
+        return original
+    
+    # Fix problematic Axes configurations in a single pass
+    script_content = _AXES_RE.sub(fix_match, script_content)
+    
+    return script_content, fixes_applied
+
+def fix_axes_configurations_ast(script_content):
+    """Fix Axes configurations in a single pass over the script's AST"""
+    tree = ast.parse(script_content)
+    fixed_calls = [
+        node for node in ast.walk(tree)
+        if isinstance(node, ast.Call) and hoist_axes_ranges(node)
+    ]
+    if not fixed_calls:
+        return script_content, []
+    
+    # Splice only the rewritten Axes calls back into the source so the rest
+    # of the script (comments, formatting) is left untouched. AST column
+    # offsets are in UTF-8 bytes, so splice on the encoded source.
+    source = script_content.encode('utf-8')
+    line_starts = [0]
+    for line in source.splitlines(keepends=True):
+        line_starts.append(line_starts[-1] + len(line))
+    
+    edits = []
+    for node in fixed_calls:
+        start = line_starts[node.lineno - 1] + node.col_offset
+        end = line_starts[node.end_lineno - 1] + node.end_col_offset
+        edits.append((start, end, node))
+    edits.sort(key=lambda edit: edit[0])
+    
+    pieces = []
+    position = 0
+    for start, end, node in edits:
+        if start < position:
+            # Nested in a call that was already rewritten
+            continue
+        pieces.append(source[position:start])
+        pieces.append(ast.unparse(node).encode('utf-8'))
+        position = end
+    pieces.append(source[position:])
+    
+    fixes_applied = ["Fixed Axes configuration - moved ranges out of axis configs"] * len(fixed_calls)
+    return b''.join(pieces).decode('utf-8'), fixes_applied
+
+def hoist_axes_ranges(call):
+    """Move x_range/y_range out of an Axes call's axis config dicts, returning True if changed"""
+    func = call.func
+    name = func.id if isinstance(func, ast.Name) else getattr(func, 'attr', None)
+    if name not in ('Axes', 'ThreeDAxes'):
+        return False
+    
+    changed = False
+    insert_at = 0
+    for config_name, range_name in (('x_axis_config', 'x_range'), ('y_axis_config', 'y_range')):
+        config = next((kw for kw in call.keywords if kw.arg == config_name), None)
+        if config is None or not isinstance(config.value, ast.Dict):
+            continue
+        
+        config_dict = config.value
+        for i, key in enumerate(config_dict.keys):
+            if isinstance(key, ast.Constant) and key.value == range_name:
+                break
+        else:
+            continue
+        
+        del config_dict.keys[i]
+        range_value = config_dict.values.pop(i)
+        
+        # An explicit top-level range wins over the one in the config
+        if not any(kw.arg == range_name for kw in call.keywords):
+            call.keywords.insert(insert_at, ast.keyword(arg=range_name, value=range_value))
+            insert_at += 1
+        if not config_dict.keys:
+            call.keywords.remove(config)
+        changed = True
+    
+    return changed
+
+def fix_single_axes_config(axes_string):
+    """Fix a single Axes configuration"""
+    # This is a simplified version - you might want to enhance this
+    # for more complex cases
+    
+    # Basic fix: if we see x_axis_config with x_range, try to extract it
+    if 'x_axis_config' in axes_string and 'x_range' in axes_string:
+        # Simple replacement for common patterns
+        axes_string = _X_AXIS_CFG_RE.sub(r'x_range=\1', axes_string)
+    
+    if 'y_axis_config' in axes_string and 'y_range' in axes_string:
+        axes_string = _Y_AXIS_CFG_RE.sub(r'y_range=\1', axes_string)
+    
+    return axes_string
+
+def validate_script(script_content):
+    """Check the script parses, imports manim and defines MainScene, returning an error message or None"""
+    try:
+        tree = ast.parse(script_content)
+    except SyntaxError as e:
+        return ''.join(traceback.format_exception_only(e))
+    
+    imports_manim = any(
+        (isinstance(node, ast.ImportFrom) and node.module == 'manim')
+        or (isinstance(node, ast.Import) and any(alias.name == 'manim' for alias in node.names))
+        for node in tree.body
+    )
+    if not imports_manim:
+        return "NameError: the script does not import manim (expected 'from manim import *')"
+    
+    if not any(isinstance(node, ast.ClassDef) and node.name == 'MainScene' for node in tree.body):
+        return "NameError: the script does not define a MainScene class"
+    
+    return None
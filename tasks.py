@@ -0,0 +1,282 @@
+"""Render jobs that can run in the app process or on an RQ worker"""
+import subprocess
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import time
+import queue
+import itertools
+from pathlib import Path
+
+# Force UTF-8 output from Manim child processes
+_MANIM_ENV_OVERRIDES = {
+    'PYTHONIOENCODING': 'utf-8',
+    'PYTHONLEGACYWINDOWSFSENCODING': '0'
+}
+
+# Scratch space for renders; RAM-backed when /dev/shm is available so
+# Manim's partial movie files never touch the disk
+_TMP_ROOT = Path('/dev/shm') if Path('/dev/shm').is_dir() else Path(tempfile.gettempdir())
+
+# Rendered videos keyed by a hash of the script and render quality
+_RENDER_QUALITY = 'low_quality'
+_CACHE_DIR = Path('render_cache')
+_CACHE_DIR.mkdir(exist_ok=True)
+
+# Compiled LaTeX and text SVGs are content-hashed by Manim, so keep them with
+# the render cache; formulas seen before skip the LaTeX subprocess entirely
+_TEX_DIR = _CACHE_DIR / 'tex'
+_TEXT_DIR = _CACHE_DIR / 'text'
+
+# Manim's partial movie cache outlives the per-render work dirs so unchanged
+# animation segments are reused across edits; one per process since Manim
+# rewrites files in it while rendering
+_PARTIAL_MOVIE_DIR = _TMP_ROOT / f"manim_partial_movies_{os.getpid()}"
+
+# Work dirs older than this are left over from killed renders
+_STALE_WORK_DIR_AGE = 3600
+
+# Render cache files (videos, compiled LaTeX and text) unused for this long are
+# evicted; cache hits refresh a video's mtime
+_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+
+# Renders taking longer than this are stopped, matching the RQ job timeout
+_RENDER_TIMEOUT = 600
+
+# Warm render worker that keeps Manim imported between renders; the lock
+# serialises jobs on its stdin/stdout pipes. A reader thread moves its replies
+# onto a queue so they can be awaited with a deadline on every platform.
+# RQ workers only keep it (and the partial movie dir above) across jobs when
+# run as rq.worker.SimpleWorker; the default worker forks a process per job
+_WORKER_SCRIPT = Path(__file__).with_name('_render_worker.py')
+_worker = None
+_worker_replies = None
+_WORKER_LOCK = threading.Lock()
+
+# Process-wide counter that keeps session IDs unique within a nanosecond; kept
+# here since Streamlit re-executes app.py on every rerun
+_session_counter = itertools.count()
+
+def render_job(script_content, work_prefix, force_rerender=False, on_progress=None):
+    """Save the script into a fresh work dir and render it with Manim (no Streamlit calls, so it can run on an RQ worker)"""
+    # Identical scripts reuse the previously rendered video unless a full
+    # re-render is forced
+    cache_key = hashlib.blake2b(
+        f"{_RENDER_QUALITY}\n{script_content}".encode('utf-8'),
+        digest_size=16
+    ).hexdigest()
+    cached_video = _CACHE_DIR / f"{cache_key}.mp4"
+    if cached_video.exists() and not force_rerender:
+        try:
+            os.utime(cached_video)
+        except OSError:
+            pass
+        return {
+            'returncode': 0,
+            'stdout': '',
+            'stderr': '',
+            'video_path': str(cached_video)
+        }
+
+    # The work dir lives under the scratch root and is removed on exit,
+    # keeping only the final video
+    with tempfile.TemporaryDirectory(prefix=work_prefix, dir=_TMP_ROOT, ignore_cleanup_errors=True) as tmp_dir:
+        # tmp_dir is already absolute, so no path needs resolving
+        script_path = os.path.join(tmp_dir, "animation.py")
+        media_dir = os.path.join(tmp_dir, "media")
+
+        # Save the script with UTF-8 encoding
+        with open(script_path, 'w', encoding='utf-8') as f:
+            f.write(script_content)
+
+        result = render_with_worker(script_path, media_dir, force_rerender, on_progress)
+        if result is None:
+            # The worker died, fall back to a one-off CLI render
+            result = render_with_cli(script_path, media_dir, force_rerender)
+        returncode, stdout, stderr = result
+
+        video_path = None
+        if returncode == 0:
+            # Success! Find the generated video file in a single top-down walk
+            # of the media tree, stopping at the first hit; the final video is
+            # listed before any partial movie files in its subdirectories
+            for root, _, files in os.walk(media_dir):
+                video_file = next((name for name in files if name.endswith('.mp4')), None)
+                if video_file:
+                    video_path = os.path.join(root, video_file)
+                    break
+
+            if video_path:
+                # Keep only the final video, moving it under a unique temporary
+                # name first so readers never see a partial file and concurrent
+                # renders of the same script never share one
+                fd, partial_video = tempfile.mkstemp(suffix='.part', dir=_CACHE_DIR)
+                os.close(fd)
+                shutil.move(video_path, partial_video)
+                # mkstemp creates the file owner-only
+                os.chmod(partial_video, 0o644)
+                os.replace(partial_video, cached_video)
+                video_path = str(cached_video)
+
+    return {
+        'returncode': returncode,
+        'stdout': stdout,
+        'stderr': stderr,
+        'video_path': video_path
+    }
+
+def new_session_id():
+    """Generate a short unique session ID from the clock and a counter, without an os.urandom syscall"""
+    return f"{time.time_ns():x}_{next(_session_counter)}"
+
+def manim_env():
+    """Environment for Manim child processes, forcing UTF-8 output"""
+    return {**os.environ, **_MANIM_ENV_OVERRIDES}
+
+def get_render_worker():
+    """Start the warm render worker on first use, or restart it if it has exited"""
+    global _worker, _worker_replies
+    if _worker is None or _worker.poll() is not None:
+        _worker = subprocess.Popen(
+            [sys.executable, '-u', str(_WORKER_SCRIPT)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            env=manim_env()
+        )
+        _worker_replies = queue.Queue()
+        threading.Thread(
+            target=read_worker_replies,
+            args=(_worker.stdout, _worker_replies),
+            daemon=True
+        ).start()
+    return _worker
+
+def read_worker_replies(stdout, replies):
+    """Forward each reply line from the worker to the queue, then None at EOF"""
+    for line in stdout:
+        replies.put(line)
+    replies.put(None)
+
+def stop_render_worker():
+    """Kill the render worker so the next job starts a fresh one"""
+    global _worker, _worker_replies
+    if _worker is not None:
+        _worker.kill()
+        _worker.wait()
+    _worker = None
+    _worker_replies = None
+
+def warm_up_render_worker():
+    """Start the render worker in the background so its Manim import overlaps other work"""
+    # A busy lock means a render is running, so the worker is already warm
+    if _WORKER_LOCK.acquire(blocking=False):
+        try:
+            get_render_worker()
+        finally:
+            _WORKER_LOCK.release()
+
+def render_with_worker(script_path, media_dir, disable_caching=False, on_progress=None):
+    """Render MainScene on the warm worker, returning None if the worker died"""
+    job = {
+        'script_path': str(script_path),
+        'media_dir': str(media_dir),
+        'partial_movie_dir': str(_PARTIAL_MOVIE_DIR),
+        'tex_dir': str(_TEX_DIR.resolve()),
+        'text_dir': str(_TEXT_DIR.resolve()),
+        'quality': _RENDER_QUALITY,
+        'disable_caching': disable_caching
+    }
+    with _WORKER_LOCK:
+        worker = get_render_worker()
+        replies = _worker_replies
+        finished = False
+        try:
+            worker.stdin.write(json.dumps(job) + '\n')
+            worker.stdin.flush()
+            # Progress messages (animations played so far) precede the final reply
+            deadline = time.monotonic() + _RENDER_TIMEOUT
+            while True:
+                line = replies.get(timeout=max(deadline - time.monotonic(), 0))
+                if line is None:
+                    break
+                reply = json.loads(line)
+                if 'progress' not in reply:
+                    finished = True
+                    return reply['returncode'], '', reply['stderr']
+                if on_progress:
+                    on_progress(reply['progress'])
+        except queue.Empty:
+            # A script that never finishes would hold the worker for everyone
+            return 1, '', f"TimeoutError: rendering took longer than {_RENDER_TIMEOUT} seconds and was stopped"
+        except OSError:
+            pass
+        finally:
+            # Leaving mid-job (timeout, dead pipe, or on_progress raising, e.g.
+            # a Streamlit rerun) would leave its replies in the pipe and the
+            # worker writing into a work dir that is about to be deleted
+            if not finished:
+                stop_render_worker()
+
+    # The worker exited before replying
+    return None
+
+def render_with_cli(script_path, media_dir, disable_caching=False):
+    """Render MainScene with the manim CLI in a subprocess"""
+    cmd = [
+        "manim",
+        str(script_path),
+        "MainScene",
+        "-ql",
+        f"--media_dir={media_dir}"
+    ]
+    if disable_caching:
+        cmd.append("--disable_caching")
+
+    # Execute Manim
+    try:
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            env=manim_env(),
+            timeout=_RENDER_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        return 1, '', f"TimeoutError: rendering took longer than {_RENDER_TIMEOUT} seconds and was stopped"
+    return result.returncode, result.stdout, result.stderr
+
+def sweep_stale_work_dirs():
+    """Delete manim_work_* and partial movie dirs left behind by renders that never finished, and evict old render cache files"""
+    now = time.time()
+    stale_dirs = [
+        *_TMP_ROOT.glob('manim_work_*'),
+        *_TMP_ROOT.glob('manim_partial_movies_*'),
+        # Work dirs from before renders moved to the scratch root
+        *Path('.').glob('manim_work_*')
+    ]
+    for path in stale_dirs:
+        try:
+            if now - path.stat().st_mtime > _STALE_WORK_DIR_AGE:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+    for path in _CACHE_DIR.rglob('*'):
+        try:
+            age = now - path.stat().st_mtime
+            # .part files are moves that never finished
+            max_age = _STALE_WORK_DIR_AGE if path.suffix == '.part' else _CACHE_MAX_AGE
+            if path.is_file() and age > max_age:
+                path.unlink()
+        except OSError:
+            pass
+
+sweep_stale_work_dirs()